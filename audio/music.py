@@ -1,69 +1,127 @@
 from pydub import AudioSegment
-from pydub.generators import Sine
+from dataclasses import dataclass
+from numba import njit, prange
 from typing import Final
+import numpy as np
 import os
 import csv
+import wave
+import sys
+
+# Add the parent directory to the path so we can import core
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from core.data_processing import read_numeric_rows
 
 INPUT_FILE: Final[str] = "pitch_log-gen.csv"
 OUTPUT_FILE: Final[str] = "output_music-gen.wav"
+PITCH_LOG_COLUMNS: Final[list[str]] = ["time", "energy", "frequency", "pitch"]
+
+# Output format, matching what pydub's Sine generator produces by default
+SAMPLE_RATE: Final[int] = 44100  # Hz
+SAMPLE_WIDTH: Final[int] = 2  # bytes (16-bit PCM)
+CHANNELS: Final[int] = 1
+
+# One full-scale sine period, indexed by the top 12 bits of a 32-bit phase
+_SINE_TABLE_BITS: Final[int] = 12
+_SINE_TABLE: Final[np.ndarray] = (
+    np.sin(2 * np.pi * np.arange(1 << _SINE_TABLE_BITS) / (1 << _SINE_TABLE_BITS))
+    * 32767
+).astype(np.int32)
+
+
+@dataclass
+class PitchColumns:
+    """
+    The rows of a pitch log, as one float64 array per column: the time to play each
+    tone in seconds, the energy and frequency logged for its event, and the pitch
+    of the tone in Hz.
+    """
+
+    time: np.ndarray
+    energy: np.ndarray
+    frequency: np.ndarray
+    pitch: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @classmethod
+    def empty(cls) -> "PitchColumns":
+        return cls(*(np.empty(0, dtype=np.float64) for _ in PITCH_LOG_COLUMNS))
 
 
-def read_pitch_log(filepath: str) -> list[dict[str, float]]:
+def read_pitch_log(filepath: str) -> PitchColumns:
     """
-    Read a CSV file containing pitch log data and parse it into a list of dictionaries.
-    The function attempts to detect if the file has a header row containing "time".
+    Read a CSV file containing pitch log data and parse it into columns.
+    The function attempts to detect if the file has a header row.
     Each row in the CSV is expected to have exactly 4 values in order representing:
     time, energy, frequency, and pitch.
     Args:
         filename (str): Path to the CSV file containing pitch data.
     Returns:
-        list[dict[str, float]]: List of dictionaries, where each dictionary contains:
-            - "time": The timestamp value
-            - "energy": The energy value
-            - "frequency": The frequency value
-            - "pitch": The pitch value
+        PitchColumns: Columns of float64 arrays, one entry per valid row:
+            - time: The timestamp values
+            - energy: The energy values
+            - frequency: The frequency values
+            - pitch: The pitch values
     Note:
         - Rows that don't have exactly 4 values are skipped.
         - Values that can't be converted to float are skipped.
         - Valid rows are expected to be in the order of time, energy, frequency, and pitch.
-        - Empty files return an empty list.
+        - Empty files return empty columns.
     """
-    pitch_data: list[dict[str, float]] = []
     with open(filepath, "r", newline="") as file:
-        csv_reader = csv.reader(file)
-
-        # Check if the first row is a header
+        sample = file.read(4096)
+    if not sample.strip():
+        return PitchColumns.empty()  # Empty file
+
+    # Check if the first row is a header. The sniffer judges it against the rows
+    # below, so a lone row only counts as a header if it has a "time" heading.
+    lines: list[str] = sample.splitlines()
+    has_header = "time" in [h.lower() for h in next(csv.reader(lines[:1]))]
+    if len(lines) > 1:
         try:
-            header = next(csv_reader)
-            # Assuming the header contains "time". Feel free to adjust this to "energy", "frequency", etc.
-            has_header = "time" in [h.lower() for h in header]
-            if not has_header:
-                # If not a header, reset file pointer and read again
-                file.seek(0)
-                csv_reader = csv.reader(file)
-        except StopIteration:
-            return pitch_data  # Empty file
-
-        for row in csv_reader:
-            if len(row) == 4:  # Ensure we have exactly 4 values
-                try:
-                    # TODO: Make the more flexible by checking for permutations of headings.
-                    time_val = float(row[0])
-                    energy = float(row[1])
-                    frequency = float(row[2])
-                    pitch = float(row[3])
-                    pitch_data.append(
-                        {
-                            "time": time_val,
-                            "energy": energy,
-                            "frequency": frequency,
-                            "pitch": pitch,
-                        }
-                    )
-                except ValueError:
-                    # Skip rows that can't be converted to float
-                    pass
-    return pitch_data
+            has_header = csv.Sniffer().has_header(sample)
+        except csv.Error:
+            pass  # Unrecognisable layout, keep the "time" heading check
+
+    # TODO: Make the more flexible by checking for permutations of headings.
+    df = read_numeric_rows(filepath, PITCH_LOG_COLUMNS, skiprows=1 if has_header else 0)
+    return PitchColumns(
+        *(df[column].to_numpy(dtype=np.float64) for column in PITCH_LOG_COLUMNS)
+    )
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _mix_tones(
+    accumulator: np.ndarray,
+    pitches: np.ndarray,
+    starts: np.ndarray,
+    sample_count: int,
+    sample_rate: int,
+    sine_table: np.ndarray,
+) -> None:
+    """
+    Synthesize a full-scale sine tone for each pitch and add it into the
+    accumulator at the matching start sample. Non-positive pitches are silent,
+    and any part of a tone falling outside the accumulator is cut off.
+    """
+    phase_mask = np.uint64(0xFFFFFFFF)
+    index_shift = np.uint64(32 - _SINE_TABLE_BITS)
+
+    # Tones may overlap, so events are mixed one after another and only the
+    # samples within a tone are split across threads
+    for i in range(len(pitches)):
+        if pitches[i] <= 0:
+            continue
+        # Fixed-point phase step, where 2**32 is one full period. The phase of
+        # sample k is k * phase_step, so each thread can start anywhere.
+        phase_step = np.uint64(pitches[i] * 4294967296.0 / sample_rate)
+        start = starts[i]
+        end = min(start + sample_count, len(accumulator))
+        for k in prange(max(0, -start), end - start):
+            phase = (np.uint64(k) * phase_step) & phase_mask
+            accumulator[start + k] += sine_table[phase >> index_shift]
 
 
 def generate_tone_from_pitch(pitch, duration_ms=500) -> AudioSegment:
@@ -79,54 +137,80 @@ def generate_tone_from_pitch(pitch, duration_ms=500) -> AudioSegment:
         AudioSegment: An AudioSegment object containing the generated tone,
                     or a silent segment if pitch is 0 or negative.
     """
-    if pitch > 0:
-        tone: AudioSegment = Sine(pitch).to_audio_segment(duration=duration_ms)
-        return tone
-    return AudioSegment.silent(duration=duration_ms)
-
-
-def generate_music(
-    pitch_data: list[dict[str, float]], output_file: str = OUTPUT_FILE
-) -> None:
+    # Mix a single tone into silence, so it matches the tones in generate_music
+    samples: np.ndarray = np.zeros(SAMPLE_RATE * duration_ms // 1000, dtype=np.int32)
+    _mix_tones(
+        samples,
+        np.array([pitch], dtype=np.float64),
+        np.zeros(1, dtype=np.int64),
+        len(samples),
+        SAMPLE_RATE,
+        _SINE_TABLE,
+    )
+    return AudioSegment(
+        data=samples.astype(np.int16).tobytes(),
+        sample_width=SAMPLE_WIDTH,
+        frame_rate=SAMPLE_RATE,
+        channels=CHANNELS,
+    )
+
+
+def generate_music(pitch_data: PitchColumns, output_file: str = OUTPUT_FILE) -> None:
     """
     Generate music from pitch data and save to a WAV file.
     This function creates an audio segment by placing tones at specific timestamps
     based on the 'time' value in each pitch data entry.
     Args:
-        pitch_data (list[dict[str, float]]): A list of dictionaries, where each
-            dictionary contains 'time' and 'pitch' keys with their corresponding values.
+        pitch_data (PitchColumns): Pitch log columns; only 'time' and 'pitch' are used.
         output_file (str, optional): The path where the generated audio will be saved.
             Defaults to the value of OUTPUT_FILE.
     Returns:
         None: The function saves the generated audio to a file and prints a
             confirmation message.
     Example:
-        >>> pitch_data = [{"time": 2.0, "pitch": 440.0}, {"time": 5.0, "pitch": 493.88}]
+        >>> pitch_data = read_pitch_log("pitch_log-gen.csv")
         >>> generate_music(pitch_data, "my_music.wav")
         Music generated and saved to my_music.wav
     """
-    # Find the maximum time to determine the total duration
     if not pitch_data:
         print("No pitch data provided")
         return
 
-    max_time_ms: int = (
-        int(max(event["time"] for event in pitch_data) * 1000) + 1000
-    )  # Add extra second
-
-    # Create a silent audio segment with the full duration
-    audio: AudioSegment = AudioSegment.silent(duration=max_time_ms)
+    # Convert each event's time to the sample its tone starts at
+    pitches: np.ndarray = pitch_data.pitch.astype(np.float64, copy=False)
+    starts: np.ndarray = (
+        (pitch_data.time * 1000).astype(np.int64)  # Convert time to milliseconds
+        * SAMPLE_RATE
+        // 1000
+        * CHANNELS
+    )
+
+    # The track runs until the latest start, plus an extra second. Mix into a
+    # single int32 accumulator so overlapping tones can't overflow, then clip
+    # back down to 16-bit once at the end. Tones before time 0 are cut off there.
+    accumulator: np.ndarray = np.zeros(
+        max(int(starts.max()), 0) + SAMPLE_RATE * CHANNELS, dtype=np.int32
+    )
 
     # Place each tone at its specific time
-    for event in pitch_data:
-        time_ms: int = int(event["time"] * 1000)  # Convert time to milliseconds
-        pitch: float = event["pitch"]
-        tone: AudioSegment = generate_tone_from_pitch(pitch, duration_ms=500)
-
-        # Overlay the tone at the specific time position
-        audio: AudioSegment = audio.overlay(tone, position=time_ms)
-
-    audio.export(output_file, format="wav")
+    _mix_tones(
+        accumulator,
+        pitches,
+        starts,
+        SAMPLE_RATE * 500 // 1000,
+        SAMPLE_RATE,
+        _SINE_TABLE,
+    )
+
+    np.clip(accumulator, -32768, 32767, out=accumulator)
+
+    # The output is plain 16-bit PCM, so write it directly rather than going
+    # through an AudioSegment and pydub's exporter
+    with wave.open(output_file, "wb") as wav_file:
+        wav_file.setnchannels(CHANNELS)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(accumulator.astype(np.int16).tobytes())
     print(f"Music generated and saved to {output_file}")
 
 
@@ -145,7 +229,7 @@ def create_music(input_file: str = INPUT_FILE) -> None:
         None explicitly, but may raise exceptions from called functions.
     """
     if os.path.exists(input_file):
-        pitch_data: list[dict[str, float]] = read_pitch_log(input_file)
+        pitch_data: PitchColumns = read_pitch_log(input_file)
         generate_music(pitch_data)
     else:
         print(f"Error: {input_file} not found!")
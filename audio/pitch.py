@@ -1,5 +1,6 @@
 import math
 import matplotlib.pyplot as plt
+import numpy as np
 import time as systime
 import os
 import sys
@@ -11,6 +12,10 @@ from cosmic_ray_utils import CosmicRayGenerator
 INPUT_FILE = "event_log-gen.txt"
 OUTPUT_FILE = "pitch_log-gen.txt"
 
+# 440 * exp(log(2) * log(energy) / 12) is 440 * energy ** (log(2) / 12), so the
+# mapping only needs a single power with this exponent
+_PITCH_EXP = math.log(2) / 12
+
 
 def calculate_pitch(energy):
     """
@@ -18,30 +23,43 @@ def calculate_pitch(energy):
     """
     if energy <= 0:
         return 0
-    return 440 * math.exp(math.log(2) * math.log(energy) / 12)
+    return 440 * energy**_PITCH_EXP
+
+
+def calculate_pitches(energies):
+    """
+    Calculate pitches for a whole array of energies at once, using the same
+    mapping as calculate_pitch.
+    """
+    pitches = np.zeros(len(energies))
+    positive = energies > 0
+    pitches[positive] = 440 * np.power(energies[positive], _PITCH_EXP)
+    return pitches
 
 
 def generate_pitch_log(events, output_file=OUTPUT_FILE):
     """
     Generate a log file with pitch calculations for each event.
     """
+    pitches = calculate_pitches(events.energy)
+    frequencies = np.divide(
+        1, events.time, out=np.zeros(len(events)), where=events.time != 0
+    )
+    # Build every line first, then write them all in one go. Altitude
+    # information is only included if it is available (not NaN).
+    lines = [
+        f"Time: {time_val}, Energy: {energy}, Frequency: {frequency:.2f}, Pitch: {pitch:.2f}"
+        + (f", Altitude: {altitude:.2f}\n" if not math.isnan(altitude) else "\n")
+        for time_val, energy, frequency, pitch, altitude in zip(
+            events.time.tolist(),
+            events.energy.tolist(),
+            frequencies.tolist(),
+            pitches.tolist(),
+            events.altitude.tolist(),
+        )
+    ]
     with open(output_file, "w") as f:
-        for event in events:
-            time_val = event["time"]
-            energy = event["energy"]
-            frequency = 1 / time_val if time_val != 0 else 0
-            pitch = calculate_pitch(energy)
-
-            # Include altitude information if available
-            altitude_info = (
-                f", Altitude: {event.get('altitude', 0):.2f}"
-                if "altitude" in event
-                else ""
-            )
-
-            f.write(
-                f"Time: {time_val}, Energy: {energy}, Frequency: {frequency:.2f}, Pitch: {pitch:.2f}{altitude_info}\n"
-            )
+        f.writelines(lines)
     print(f"[PITCH] Generated pitch log with {len(events)} events")
 
 
@@ -49,9 +67,9 @@ def plot_energy_vs_pitch(events, show_plot=False):
     """
     Create a plot showing the relationship between energy and pitch.
     """
-    times = [event["time"] for event in events]
-    energies = [event["energy"] for event in events]
-    pitches = [calculate_pitch(e) for e in energies]
+    times = events.time
+    energies = events.energy
+    pitches = calculate_pitches(energies)
 
     plt.figure(figsize=(10, 6))
     plt.plot(times, pitches, label="Pitch", marker="o")
@@ -70,13 +88,21 @@ if __name__ == "__main__":
     # Create a ray generator in file mode
     ray_generator = CosmicRayGenerator(mode="file", event_log=INPUT_FILE)
 
+    # Size and modification time of the log when it was last processed
+    last_seen = None
+
     while True:
         try:
             if os.path.exists(INPUT_FILE):
-                # Get events from the log file
-                events = ray_generator.read_events_from_file()
-                if events:
-                    generate_pitch_log(events)
+                # Only re-read the log when it has changed since the last pass
+                stat = os.stat(INPUT_FILE)
+                if (stat.st_size, stat.st_mtime_ns) != last_seen:
+                    last_seen = (stat.st_size, stat.st_mtime_ns)
+
+                    # Get events from the log file
+                    events = ray_generator.read_events_from_file()
+                    if events:
+                        generate_pitch_log(events)
             systime.sleep(2)
         except KeyboardInterrupt:
             print("[PITCH] Stopped.")
@@ -1,19 +1,87 @@
 import csv
+import warnings
+import numpy as np
+import pandas as pd
+
+
+def read_numeric_rows(
+    filepath: str, columns: list[str], skiprows: int = 0
+) -> pd.DataFrame:
+    """
+    Parses a headerless CSV file into float64 columns with the given names.
+
+    Args:
+        filepath (str): Path to the CSV file.
+        columns (list[str]): Names of the columns every row must fill.
+        skiprows (int): Number of lines at the start of the file to ignore.
+
+    Returns:
+        pd.DataFrame: One column per name, keeping only the rows with exactly one numeric value per column.
+
+    Raises:
+        FileNotFoundError: If the specified file does not exist.
+    """
+    # A row that reaches the "_extra" column has too many values. Those are
+    # expected, so don't warn that they don't match the names.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", pd.errors.ParserWarning)
+        df = pd.read_csv(
+            filepath,
+            header=None,
+            skiprows=skiprows,
+            names=[*columns, "_extra"],
+            index_col=False,
+            engine="c",
+            memory_map=True,
+            on_bad_lines="skip",
+        )
+
+    # Skip rows that are short, long or can't be converted to float
+    long_rows = df.pop("_extra").notna()
+    return df[~long_rows].apply(pd.to_numeric, errors="coerce").dropna()
+
+
+def _count_rows(filepath: str) -> int:
+    """
+    Counts the lines in a file, including a last line without a trailing newline.
+    """
+    with open(filepath, "rb") as file:
+        return sum(1 for _ in file)
+
+
+def _report_skipped_rows(filepath: str, headers: list[str]) -> None:
+    """
+    Prints every row of a CSV file, after the header, that read_csv skips.
+    """
+    with open(filepath, "r", newline="") as file:
+        csv_reader = csv.reader(file)
+        next(csv_reader, None)
+        for row in csv_reader:
+            if len(row) != len(headers):
+                print(
+                    f"Skipping row {row} due to unexpected number of values. Expected {len(headers)}, got {len(row)}."
+                )
+                continue
+            try:
+                for value in row:
+                    float(value)
+            except ValueError as e:
+                print(f"Skipping row {row} due to error: {e}")
 
 
 def read_csv(
     filepath: str, headers: list[str] | None | object = None, verbose: bool = True
-) -> list[dict[str, float]]:
+) -> dict[str, np.ndarray]:
     """
-    Reads a CSV file and returns a list of dictionaries containing the data.
+    Reads a CSV file and returns its data column by column.
 
     Args:
         filepath (str): Path to the CSV file.
-        headers (list[str] | None): List of headers to use for the dictionary keys. If None, the first row of the CSV is used as headers.
+        headers (list[str] | None): List of headers to use as the column names. If None, the first row of the CSV is used as headers.
         verbose (bool): If True, prints messages about skipped rows and other information.
 
     Returns:
-        list[dict[str, float]]: List of dictionaries, where each dictionary contains the data from a row in the CSV.
+        dict[str, np.ndarray]: Mapping of each header to a float64 array of that column's values, with one entry per valid row.
 
     Raises:
         FileNotFoundError: If the specified file does not exist.
@@ -22,54 +90,39 @@ def read_csv(
     Notes:
         - Rows that don't have the expected number of values are skipped.
         - Values that can't be converted to float are skipped.
-        - Empty files return an empty list.
+        - Empty files return an empty dictionary.
     """
-    pitch_data: list[dict[str, float]] = []
+    pitch_data: dict[str, np.ndarray] = {}
 
     try:
         with open(filepath, "r", newline="") as file:
-            csv_reader = csv.reader(file)
-
             # Check if the first row is a header
-            try:
-                header = next(csv_reader)
-                has_header = headers is not None or len(header) > 0
-                if has_header:
-                    # If headers are provided, use them; otherwise, use the first row as headers
-                    if headers is None:
-                        headers = header
-                    else:
-                        assert isinstance(
-                            headers, list
-                        ), "Headers must be a list of strings."
-                        # Ensure the provided headers match the CSV file's headers
-                        if len(headers) != len(header):
-                            raise ValueError(
-                                "Provided headers do not match the number of columns in the CSV file."
-                            )
-            except StopIteration:
+            header = next(csv.reader([file.readline()]), [])
+            if not header:
                 return pitch_data  # Empty file
 
+            # If headers are provided, use them; otherwise, use the first row as headers
+            if headers is None:
+                headers = header
+            else:
+                assert isinstance(headers, list), "Headers must be a list of strings."
+                # Ensure the provided headers match the CSV file's headers
+                if len(headers) != len(header):
+                    raise ValueError(
+                        "Provided headers do not match the number of columns in the CSV file."
+                    )
+
             assert isinstance(headers, list), "Headers must be a list of strings."
 
-            for row in csv_reader:
-                if len(row) == len(headers):
-                    try:
-                        # Create a dictionary using the provided or detected headers
-                        row_dict = {
-                            headers[i]: float(row[i]) for i in range(len(headers))
-                        }
-                        pitch_data.append(row_dict)
-                    except ValueError as e:
-                        if verbose:
-                            print(f"Skipping row {row} due to error: {e}")
-                else:
-                    if verbose:
-                        print(
-                            f"Skipping row {row} due to unexpected number of values. Expected {len(headers)}, got {len(row)}."
-                        )
+        df = read_numeric_rows(filepath, headers, skiprows=1)
 
     except FileNotFoundError as e:
         raise FileNotFoundError(f"File not found: {filepath}") from e
 
+    if verbose and _count_rows(filepath) - 1 > len(df):
+        _report_skipped_rows(filepath, headers)
+
+    pitch_data = {
+        str(column): df[column].to_numpy(dtype=np.float64) for column in df.columns
+    }
     return pitch_data
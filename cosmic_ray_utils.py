@@ -1,7 +1,78 @@
 import time
-import random
 import numpy as np
+import pandas as pd
 import os
+import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from numba import njit, prange
+from typing import Optional
+
+
+@njit(parallel=True, cache=True, fastmath=True)
+def _accumulate_pulses(
+    signal_values: np.ndarray,
+    indices: np.ndarray,
+    energies: np.ndarray,
+    decay_template: np.ndarray,
+) -> None:
+    """
+    Add a copy of the decay template, scaled by each event's energy, into the
+    signal starting at that event's index. Pulses are cut off at the signal's end.
+    The indices must be sorted in ascending order.
+    """
+    pulse_length = len(decay_template)
+
+    # Each sample gathers the pulses covering it, so threads never share a write
+    for k in prange(len(signal_values)):
+        first = np.searchsorted(indices, k - pulse_length + 1)
+        last = np.searchsorted(indices, k, side="right")
+        total = 0.0
+        for i in range(first, last):
+            total += energies[i] * decay_template[k - indices[i]]
+        signal_values[k] += total
+
+
+@lru_cache(maxsize=None)
+def _decay_template(sample_rate: int) -> np.ndarray:
+    """
+    Return the shape of a single event's pulse: a 100ms exponential decay with a
+    20ms time constant. Cached per sample rate and read-only, since it is shared.
+    """
+    decay_length: int = int(0.1 * sample_rate)  # 100ms decay
+    template: np.ndarray = np.exp(
+        -np.arange(decay_length) / (0.02 * sample_rate)
+    ).astype(np.float32)
+    template.setflags(write=False)
+    return template
+
+
+@dataclass
+class CosmicRayEvents:
+    """
+    A set of detected cosmic rays: the time of each event in seconds, its energy in
+    keV and the altitude it was detected at in meters.
+    """
+
+    time: np.ndarray
+    energy: np.ndarray
+    altitude: np.ndarray  # NaN where the altitude isn't known
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @classmethod
+    def empty(cls) -> "CosmicRayEvents":
+        return cls(np.empty(0), np.empty(0), np.empty(0))
+
+    def sorted_by_time(self) -> "CosmicRayEvents":
+        """
+        Return a copy of the events in time order.
+        """
+        order: np.ndarray = np.argsort(self.time, kind="stable")
+        return CosmicRayEvents(
+            self.time[order], self.energy[order], self.altitude[order]
+        )
 
 
 class CosmicRayGenerator:
@@ -58,31 +129,49 @@ class CosmicRayGenerator:
         self.event_log: str = kwargs.get("event_log", "event_log.txt")
         self.duration: float = kwargs.get("duration", 10)
         self.noise_level: float = kwargs.get("noise_level", 0.05)
+        self.rng: np.random.Generator = np.random.default_rng()
+
+        # For hardware simulation, keep the signal file open for the generator's
+        # lifetime so each signal change is a single write, creating it if needed
+        self.signal_fd: Optional[int] = None
+        if self.mode == "hardware_sim":
+            self.signal_fd = os.open(self.signal_file, os.O_WRONLY | os.O_CREAT, 0o644)
+            if os.fstat(self.signal_fd).st_size == 0:
+                os.pwrite(self.signal_fd, b"0", 0)
+            # Drop anything after the one signal byte left over from older writers
+            os.ftruncate(self.signal_fd, 1)
+
+    def close(self) -> None:
+        """
+        Close the signal file, if one is open.
+        """
+        if self.signal_fd is not None:
+            os.close(self.signal_fd)
+            self.signal_fd = None
 
-        # For hardware simulation, ensure the signal file exists
-        if self.mode == "hardware_sim" and not os.path.exists(self.signal_file):
-            with open(self.signal_file, "w") as f:
-                f.write("0")
+    def __del__(self) -> None:
+        # __init__ may have raised before the signal file was set up
+        if hasattr(self, "signal_fd"):
+            self.close()
 
-    def get_predefined_events(self) -> list[dict[str, float]]:
+    def get_predefined_events(self) -> CosmicRayEvents:
         """
         Return a predefined set of cosmic ray events.
         Used for consistent testing and visualization.
         """
-        return [
-            {"time": 1.0, "energy": 2.3, "altitude": 2500},
-            {"time": 4.5, "energy": 1.5, "altitude": 2300},
-            {"time": 6.2, "energy": 3.0, "altitude": 2700},
-            {"time": 8.7, "energy": 2.0, "altitude": 2400},
-        ]
+        return CosmicRayEvents(
+            time=np.array([1.0, 4.5, 6.2, 8.7]),
+            energy=np.array([2.3, 1.5, 3.0, 2.0]),
+            altitude=np.array([2500.0, 2300.0, 2700.0, 2400.0]),
+        )
 
     def generate_random_event(self) -> dict[str, float]:
         """
         Generate a single random cosmic ray event.
         """
-        energy: float = random.uniform(1, 10)
+        energy: float = self.rng.uniform(1, 10)
         duration: float = energy / 10  # Simple conversion for simulation
-        altitude: float = random.uniform(2000, 3000)  # Simulated altitude in meters
+        altitude: float = self.rng.uniform(2000, 3000)  # Simulated altitude in meters
 
         return {
             "time": time.time(),
@@ -91,6 +180,18 @@ class CosmicRayGenerator:
             "altitude": altitude,
         }
 
+    def generate_random_events(self, count: int) -> CosmicRayEvents:
+        """
+        Generate several random cosmic ray events at once, spread evenly in time
+        from the start of the duration.
+        """
+        # Draw every event's values in one call per field
+        return CosmicRayEvents(
+            time=np.arange(count) * (self.duration / 10),
+            energy=self.rng.uniform(1, 10, count),
+            altitude=self.rng.uniform(2000, 3000, count),  # In meters
+        )
+
     def simulate_continuous(self, callback=None, stop_event=None) -> None:
         """
         Continuously simulate cosmic ray events until stopped.
@@ -103,7 +204,7 @@ class CosmicRayGenerator:
             if stop_event and stop_event.is_set():
                 break
 
-            wait_time: float = random.uniform(2, 5)
+            wait_time: float = self.rng.uniform(2, 5)
             time.sleep(wait_time)
 
             event: dict[str, float] = self.generate_random_event()
@@ -111,46 +212,54 @@ class CosmicRayGenerator:
             if callback:
                 callback(event)
 
-            if self.mode == "hardware_sim":
+            if self.mode == "hardware_sim" and self.signal_fd is not None:
                 # Simulate hardware signal
-                with open(self.signal_file, "w") as f:
-                    f.write("1")
-
+                os.pwrite(self.signal_fd, b"1", 0)
                 time.sleep(event["duration"])
-
-                with open(self.signal_file, "w") as f:
-                    f.write("0")
+                os.pwrite(self.signal_fd, b"0", 0)
 
             print(
                 f"Ray: Energy={event['energy']:.2f}, Duration={event['duration']:.2f}s"
             )
 
-    def read_events_from_file(self) -> list[dict[str, float]]:
+    def read_events_from_file(self) -> CosmicRayEvents:
         """
         Read cosmic ray events from a log file.
         """
-        events: list[dict[str, float]] = []
-        if not os.path.exists(self.event_log):
-            return events
-
-        with open(self.event_log, "r") as file:
-            lines: list[str] = file.readlines()
-            for line in lines[1:]:  # Skip header
-                parts: list[str] = line.strip().split()
-                if len(parts) >= 2:
-                    try:
-                        # Basic format: time energy [altitude]
-                        time_val: float = float(parts[0])
-                        energy: float = float(parts[1])
-                        altitude: float = float(parts[2]) if len(parts) > 2 else 0
-                        events.append(
-                            {"time": time_val, "energy": energy, "altitude": altitude}
-                        )
-                    except (ValueError, IndexError):
-                        pass
-        return events
-
-    def get_events(self) -> list[dict[str, float]]:
+        # An empty log can't be memory-mapped, so it is handled up front
+        if not os.path.exists(self.event_log) or os.path.getsize(self.event_log) == 0:
+            return CosmicRayEvents.empty()
+
+        # Basic format: time energy [altitude], whitespace separated, after a header.
+        # Memory-map the log so the C parser reads it in place, straight into arrays.
+        try:
+            # Longer rows are expected, so don't warn that they don't match names
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", pd.errors.ParserWarning)
+                df = pd.read_csv(
+                    self.event_log,
+                    sep=r"\s+",
+                    header=None,
+                    skiprows=1,
+                    names=["time", "energy", "altitude"],
+                    index_col=False,  # Keep the first three values of longer rows
+                    engine="c",
+                    memory_map=True,
+                    on_bad_lines="skip",
+                )
+        except pd.errors.EmptyDataError:
+            return CosmicRayEvents.empty()
+
+        df = df.apply(pd.to_numeric, errors="coerce")
+        # Events without an altitude are kept, with their altitude left as NaN
+        df = df.dropna(subset=["time", "energy"])
+        return CosmicRayEvents(
+            time=df["time"].to_numpy(dtype=np.float64),
+            energy=df["energy"].to_numpy(dtype=np.float64),
+            altitude=df["altitude"].to_numpy(dtype=np.float64),
+        )
+
+    def get_events(self) -> CosmicRayEvents:
         """
         Get cosmic ray events based on the selected mode.
         """
@@ -160,18 +269,10 @@ class CosmicRayGenerator:
             return self.read_events_from_file()
         elif self.mode == "simulated":
             # For one-time simulated events, generate a few random ones
-            events: list[dict[str, float]] = []
-            base_time: float = time.time()
-            for i in range(random.randint(3, 8)):
-                event: dict[str, float] = self.generate_random_event()
-                event["time"] = i * (
-                    self.duration / 10
-                )  # Spread events over the duration
-                events.append(event)
-            return events
+            return self.generate_random_events(int(self.rng.integers(3, 9)))
         else:
-            # Default empty list for other modes
-            return []
+            # No events for other modes
+            return CosmicRayEvents.empty()
 
     def generate_signal(self, sample_rate: int = 100) -> tuple[np.ndarray, np.ndarray]:
         """
@@ -182,29 +283,24 @@ class CosmicRayGenerator:
 
         Returns:
         - time_values: Array of time points
-        - signal_values: Array of signal values
+        - signal_values: Array of signal values (float32)
         """
-        # Create time base and empty signal
+        # Create time base and a noise floor with random noise around the noise
+        # level. The signal is kept in float32, which is plenty for a detector
+        # trace and halves the memory traffic of accumulating pulses into it.
         time_values: np.ndarray = np.arange(0, self.duration, 1 / sample_rate)
-        signal_values: np.ndarray = np.full_like(time_values, self.noise_level)
-
-        # Add random noise
-        signal_values += np.random.uniform(-0.01, 0.01, size=len(time_values))
+        signal_values: np.ndarray = self.rng.random(len(time_values), dtype=np.float32)
+        signal_values *= 0.02
+        signal_values += self.noise_level - 0.01
 
         # Get events
-        events: list[dict[str, float]] = self.get_events()
-
-        # Add events to signal
-        for event in events:
-            # Find the index corresponding to the event time
-            idx: int = int(event["time"] * sample_rate)
-            if idx < len(signal_values):
-                # Create a decaying pulse
-                decay_length: int = int(0.1 * sample_rate)  # 100ms decay
-                end_idx: int = min(idx + decay_length, len(signal_values))
-                decay: np.ndarray = event["energy"] * np.exp(
-                    -np.arange(end_idx - idx) / (0.02 * sample_rate)
-                )
-                signal_values[idx:end_idx] += decay
+        events: CosmicRayEvents = self.get_events().sorted_by_time()
+        # Find the index corresponding to each event time, in ascending order
+        indices: np.ndarray = (events.time * sample_rate).astype(np.int64)
+
+        # Add every event's energy-scaled pulse to the signal
+        _accumulate_pulses(
+            signal_values, indices, events.energy, _decay_template(sample_rate)
+        )
 
         return time_values, signal_values
@@ -1,4 +1,5 @@
 import RPi.GPIO as GPIO
+import signal
 import time
 
 # GPIO setup
@@ -17,40 +18,43 @@ log_file = "event_log.txt"
 with open(log_file, "w") as file:
     file.write("time\tenergy\n")
 
+
+def on_rise(channel):
+    print("[DETECTOR] Ray detected!")
+    start = time.perf_counter()
+
+    # Only poll while the ray lasts; between rays the kernel wakes us on the edge
+    while GPIO.input(SIGNAL_PIN) == GPIO.HIGH:
+        time.sleep(0.0001)
+
+    end = time.perf_counter()
+    duration = end - start
+    energy = duration * 1e6  # dummy formula
+
+    # Print duration and energy for debugging
+    print(f"  Duration: {duration:.6f} s")
+    print(f"  Approx Energy: {energy:.2f} eV")
+
+    # Log the time and energy to the file in the same format as printed in the console
+    with open(log_file, "a") as file:
+        file.write(f"{duration:.6f}\t{energy:.2f}\n")
+
+    # Buzz for 100ms
+    GPIO.output(BUZZER_PIN, GPIO.HIGH)
+    time.sleep(0.1)
+    GPIO.output(BUZZER_PIN, GPIO.LOW)
+    print()
+
+
+GPIO.add_event_detect(SIGNAL_PIN, GPIO.RISING, callback=on_rise, bouncetime=1)
+
 print("[DETECTOR] Ready. Touch 3.3V to GPIO 23 to simulate a ray.")
 
 try:
-    while True:
-        if GPIO.input(SIGNAL_PIN) == GPIO.HIGH:
-            print("[DETECTOR] Ray detected!")
-            start = time.time()
-
-            while GPIO.input(SIGNAL_PIN) == GPIO.HIGH:
-                time.sleep(0.001)
-
-            end = time.time()
-            duration = end - start
-            energy = duration * 1e6  # dummy formula
-
-            # Print duration and energy for debugging
-            print(f"  Duration: {duration:.6f} s")
-            print(f"  Approx Energy: {energy:.2f} eV")
-           
-            # Log the time and energy to the file in the same format as printed in the console
-            with open(log_file, "a") as file:
-                file.write(f"{duration:.6f}\t{energy:.2f}\n")
-           
-            # Buzz for 100ms
-            GPIO.output(BUZZER_PIN, GPIO.HIGH)
-            time.sleep(0.1)
-            GPIO.output(BUZZER_PIN, GPIO.LOW)
-            print()
-
-        time.sleep(0.01)
+    signal.pause()
 
 except KeyboardInterrupt:
     print("\n[DETECTOR] Stopped.")
 
 finally:
     GPIO.cleanup()
-
@@ -1,21 +1,22 @@
+import os
 import time
 
 
 def monitor_rays(signal_file="ray_signal-gen.txt"):
     print("Monitoring for rays.")
 
+    # Keep the signal file open and re-read its first byte in place, instead of
+    # opening and closing it on every poll
+    fd = os.open(signal_file, os.O_RDONLY)
+
     try:
         while True:
-            with open(signal_file, "r") as f:
-                signal = f.read().strip()
+            signal = os.pread(fd, 1, 0)
 
-            if signal == "1":
+            if signal == b"1":
                 start_time = time.time()
 
-                while True:
-                    with open(signal_file, "r") as f:
-                        if f.read().strip() == "0":
-                            break
+                while os.pread(fd, 1, 0) != b"0":
                     time.sleep(0.001)
 
                 end_time = time.time()
@@ -31,6 +32,9 @@ def monitor_rays(signal_file="ray_signal-gen.txt"):
     except KeyboardInterrupt:
         print("Stopped.")
 
+    finally:
+        os.close(fd)
+
 
 if __name__ == "__main__":
     with open("ray_signal-gen.txt", "w") as f:
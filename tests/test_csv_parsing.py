@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the project directories to the path so we can import the parsers
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.extend([ROOT, os.path.join(ROOT, "audio")])
+from music import read_pitch_log
+from core.data_processing import read_csv
+from cosmic_ray_utils import CosmicRayGenerator
+
+
+class TestRowWidths(unittest.TestCase):
+    """
+    Rows with the wrong number of values must be skipped (or, for event logs,
+    trimmed) without shifting the columns of the rows around them.
+    """
+
+    def write(self, text: str) -> str:
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write(text)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_read_pitch_log_skips_long_first_row(self):
+        path = self.write(
+            "time,energy,frequency,pitch\n9,1,2,3,4\n5,6,7,8\n1,2,3,4,5,6\n1,2\n"
+        )
+        columns = read_pitch_log(path)
+        self.assertEqual(columns.time.tolist(), [5.0])
+        self.assertEqual(columns.energy.tolist(), [6.0])
+        self.assertEqual(columns.frequency.tolist(), [7.0])
+        self.assertEqual(columns.pitch.tolist(), [8.0])
+
+    def test_read_csv_skips_long_first_row(self):
+        path = self.write("a,b,c\n9,1,2,3\n5,6,7\n1,2\n")
+        data = read_csv(path, verbose=False)
+        self.assertEqual(
+            {key: values.tolist() for key, values in data.items()},
+            {"a": [5.0], "b": [6.0], "c": [7.0]},
+        )
+
+    def test_read_events_from_file_trims_long_first_row(self):
+        path = self.write("time energy\n1 2 3 4\n5 6\n")
+        events = CosmicRayGenerator(mode="file", event_log=path).read_events_from_file()
+        self.assertEqual(events.time.tolist(), [1.0, 5.0])
+        self.assertEqual(events.energy.tolist(), [2.0, 6.0])
+        self.assertEqual(events.altitude[0], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
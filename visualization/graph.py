@@ -1,16 +1,26 @@
 import numpy as np
+import matplotlib
+import os
+
+# Headless runs (e.g. rendering to a file) don't need a window, so use the faster
+# non-interactive Agg backend. This has to happen before pyplot is imported.
+if os.environ.get("PARAKEET_HEADLESS"):
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.lines import Line2D
 from matplotlib.figure import Figure
 from matplotlib.axes import Axes
-import os
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
 import sys
+import time
 from typing import Final, Optional
 
 # Add the parent directory to the path so we can import cosmic_ray_utils
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from cosmic_ray_utils import CosmicRayGenerator
+from cosmic_ray_utils import CosmicRayEvents, CosmicRayGenerator
 
 
 class CosmicRayVisualizer:
@@ -21,6 +31,8 @@ class CosmicRayVisualizer:
     DEFAULT_EVENT_INTENSITY: Final[float] = 2.0  # Intensity of detected waves
     DEFAULT_TIME_STEP: Final[float] = 0.1  # Step size for live update
     DEFAULT_GENERATOR_MODE: Final[str] = "predefined"  # Mode for cosmic ray generator
+    DEFAULT_BLIT: Final[bool] = True  # Redraw only the line each frame
+    DEFAULT_FRAME_SKIP: Final[bool] = True  # Skip frames to keep up in real time
     DEFAULT_COLORS: dict[str, str] = {"background": "white", "foreground": "black"}
 
     def __init__(
@@ -33,6 +45,8 @@ class CosmicRayVisualizer:
         sample_rate: int = DEFAULT_SAMPLE_RATE,
         generator_mode: str = DEFAULT_GENERATOR_MODE,
         colors: dict[str, str] = DEFAULT_COLORS,
+        blit: bool = DEFAULT_BLIT,
+        frame_skip: bool = DEFAULT_FRAME_SKIP,
     ) -> None:
         """
         Initialize the cosmic ray visualizer.
@@ -44,16 +58,24 @@ class CosmicRayVisualizer:
         self.sample_rate: int = sample_rate
         self.generator_mode: str = generator_mode
         self.colors: dict[str, str] = colors
+        self.blit: bool = blit  # Turn off for backends where blitting misbehaves
+        self.frame_skip: bool = frame_skip
 
-        # Internal data
-        self.current_time: list[float] = []
-        self.current_energy: list[float] = []
+        # Internal data, preallocated with one slot per animation frame. The
+        # energies are filled in by setup(), once the events are known.
+        self.frame_count: int = int(self.duration / self.time_step)
+        self.current_time: np.ndarray = np.arange(self.frame_count) * self.time_step
+        self.current_energy: np.ndarray = np.full(self.frame_count, np.nan)
+        # The part of the trace shown so far, padded with NaN (which isn't drawn)
+        self.visible_energy: np.ndarray = np.full(self.frame_count, np.nan)
         self.ray_generator: Optional[CosmicRayGenerator] = None
-        self.events: Optional[list[dict[str, float]]] = None
+        self.events: Optional[CosmicRayEvents] = None  # Sorted by time
         self.fig: Optional[Figure] = None
         self.ax: Optional[Axes] = None
         self.line: Optional[Line2D] = None
         self.animation: Optional[animation.FuncAnimation] = None
+        self.frame_interval: float = 0.1  # Seconds between animation frames
+        self.start_time: Optional[float] = None  # When the first frame was drawn
 
     def __str__(self) -> str:
         """String representation of the visualizer."""
@@ -66,54 +88,104 @@ class CosmicRayVisualizer:
             f"\tevent_intensity={self.event_intensity},\n"
             f"\ttime_step={self.time_step},\n"
             f"\tsample_rate={self.sample_rate},\n"
+            f"\tblit={self.blit},\n"
+            f"\tframe_skip={self.frame_skip},\n"
             f")"
         )
 
-    def setup(self) -> "CosmicRayVisualizer":
-        """Set up the visualization."""
+    def compute_trace(self) -> "CosmicRayVisualizer":
+        """Generate the events and compute the energy for every frame."""
         # Create a cosmic ray generator
         self.ray_generator = CosmicRayGenerator(
             mode=self.generator_mode,
             duration=self.duration,
             noise_level=self.noise_level,
         )
-        self.events = self.ray_generator.get_events()
-
-        # Initialize plot
-        self.fig, self.ax = plt.subplots()
-        self.fig.patch.set_facecolor(self.colors["background"])
-        self.ax.set_facecolor(self.colors["background"])
-        self.ax.set_xlim(0, self.duration)
-        self.ax.set_ylim(0, self.event_intensity + self.noise_level)
-        self.ax.set_xlabel("Time (s)", color=self.colors["foreground"])
-        self.ax.set_ylabel("Energy", color=self.colors["foreground"])
-        self.ax.tick_params(axis="x", colors=self.colors["foreground"])
-        self.ax.tick_params(axis="y", colors=self.colors["foreground"])
-
-        (self.line,) = self.ax.plot([], [], self.colors["foreground"], lw=1)
+        self.events = self.ray_generator.get_events().sorted_by_time()
+
+        # Add each event's energy to the few frames within a time step of it
+        candidates: np.ndarray = np.floor(self.events.time / self.time_step).astype(
+            np.int64
+        )[:, None] + np.arange(-2, 3)
+        in_range: np.ndarray = (candidates >= 0) & (candidates < self.frame_count)
+        candidates = np.where(in_range, candidates, 0)
+        nearby: np.ndarray = in_range & (
+            np.abs(self.events.time[:, None] - self.current_time[candidates])
+            < self.time_step
+        )
+        self.current_energy = self.noise_level + self.ray_generator.rng.uniform(
+            -0.01, 0.01, self.frame_count
+        )
+        self.current_energy += np.bincount(
+            candidates[nearby],
+            weights=np.broadcast_to(self.events.energy[:, None], nearby.shape)[nearby],
+            minlength=self.frame_count,
+        )
+        return self
+
+    def plot_axes(self, fig: Figure, animated: bool) -> tuple[Axes, Line2D]:
+        """Add styled axes to the figure, with an empty line for the trace."""
+        fig.patch.set_facecolor(self.colors["background"])
+        ax: Axes = fig.add_subplot()
+        ax.set_facecolor(self.colors["background"])
+        ax.set_xlim(0, self.duration)
+        ax.set_ylim(0, self.event_intensity + self.noise_level)
+        ax.set_xlabel("Time (s)", color=self.colors["foreground"])
+        ax.set_ylabel("Energy", color=self.colors["foreground"])
+        ax.tick_params(axis="x", colors=self.colors["foreground"])
+        ax.tick_params(axis="y", colors=self.colors["foreground"])
+
+        # The frame times never change, so give the line all of them up front and
+        # only update its energies as the trace is revealed
+        (line,) = ax.plot(
+            self.current_time,
+            np.full(self.frame_count, np.nan),
+            self.colors["foreground"],
+            lw=1,
+            animated=animated,
+        )
+        return ax, line
+
+    def reveal(self, line: Line2D, frame: int) -> None:
+        """Show the trace on the line up to and including the given frame."""
+        self.visible_energy[: frame + 1] = self.current_energy[: frame + 1]
+        self.visible_energy[frame + 1 :] = np.nan
+        line.set_ydata(self.visible_energy)
+
+    def setup(self) -> "CosmicRayVisualizer":
+        """Set up the visualization."""
+        self.compute_trace()
+
+        # Initialize plot. When blitting, the line is redrawn every frame, so keep
+        # it out of the blit background.
+        self.fig = plt.figure()
+        self.ax, self.line = self.plot_axes(self.fig, animated=self.blit)
         if self.fig.canvas.manager is not None:
             self.fig.canvas.manager.set_window_title("Cosmic Ray Visualization")
         return self
 
+    def init(self) -> tuple[Line2D]:
+        """Initial frame for animation, with an empty line."""
+        assert self.line is not None, "Line should be initialized before init"
+        self.reveal(self.line, -1)
+        self.start_time = None  # Set when the first frame is drawn
+        return (self.line,)
+
     def update(self, frame) -> tuple[Line2D]:
         """Update function for animation."""
         assert self.line is not None, "Line should be initialized before update"
 
-        t = frame * self.time_step
-        if t > self.duration and self.line is not None:
-            return (self.line,)
+        # If drawing can't keep up with the interval, jump ahead to the frame that
+        # is due by now rather than falling further behind. The trace is already
+        # computed, so skipped frames cost nothing.
+        if self.frame_skip:
+            if self.start_time is None:
+                self.start_time = time.perf_counter() - frame * self.frame_interval
+            elapsed: float = time.perf_counter() - self.start_time
+            due: int = min(int(elapsed / self.frame_interval), self.frame_count - 1)
+            frame = max(frame, due)
 
-        energy = self.noise_level + np.random.uniform(-0.01, 0.01)
-
-        if self.events is not None:
-            for event in self.events:
-                if abs(event["time"] - t) < self.time_step:
-                    energy += event["energy"]  # Add disturbance
-
-        self.current_time.append(t)
-        self.current_energy.append(energy)
-
-        self.line.set_data(self.current_time, self.current_energy)
+        self.reveal(self.line, frame)
         return (self.line,)
 
     def start_animation(self, interval: int = 100) -> "CosmicRayVisualizer":
@@ -124,15 +196,61 @@ class CosmicRayVisualizer:
                 self.fig is not None
             ), "Figure should be initialized before animation. Setup failed."
 
+        self.frame_interval = interval / 1000
         self.animation = animation.FuncAnimation(
             self.fig,
             self.update,
-            frames=int(self.duration / self.time_step),
+            frames=self.frame_count,
+            init_func=self.init,
             interval=interval,
-            blit=True,
+            blit=self.blit,
         )
         return self
 
+    def save(self, path: str) -> None:
+        """Render the whole animation to a video file with ffmpeg."""
+        if self.animation is None:
+            self.start_animation()
+        assert self.animation is not None, "Animation should be started before save"
+
+        # Play back in real time, one frame per time step. Every frame is wanted
+        # in the file, however long each takes to render, so don't skip any.
+        writer = animation.FFMpegWriter(fps=round(1 / self.time_step))
+        frame_skip, self.frame_skip = self.frame_skip, False
+        try:
+            self.animation.save(path, writer=writer)
+        finally:
+            self.frame_skip = frame_skip
+
+    def render_gif(self, path: str, interval: int = 100) -> None:
+        """
+        Render every frame off-screen and save them as an animated GIF. This
+        bypasses pyplot and any GUI backend entirely, for batch runs.
+        """
+        if self.ray_generator is None:
+            self.compute_trace()
+
+        # A bare Figure on an Agg canvas isn't tracked by pyplot, so it needs no
+        # event loop and is freed as soon as it goes out of scope
+        fig: Figure = Figure()
+        FigureCanvasAgg(fig)
+        _, line = self.plot_axes(fig, animated=False)
+
+        images: list[Image.Image] = []
+        for frame in range(self.frame_count):
+            self.reveal(line, frame)
+            fig.canvas.draw()
+            # GIF frames are paletted anyway, so only keep one byte per pixel
+            images.append(
+                Image.fromarray(np.asarray(fig.canvas.buffer_rgba()))
+                .convert("RGB")
+                .convert("P", palette=Image.Palette.ADAPTIVE)
+            )
+
+        images[0].save(
+            path, save_all=True, append_images=images[1:], duration=interval, loop=0
+        )
+
     def show(self) -> None:
         """Display the visualization."""
         plt.show()
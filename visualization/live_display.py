@@ -1,91 +1,139 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 from datetime import datetime, timedelta
 import os
 import sys
 
-# Add the parent directory to the path so we can import cosmic_ray_utils
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
-from cosmic_ray_utils import CosmicRayGenerator
-
 # Constants
 DURATION = 10  # seconds
 TIME_STEP = 0.1  # Step size for live update
-
-# Create cosmic ray generator for visualization
-ray_generator = CosmicRayGenerator(mode="predefined", duration=DURATION)
-events = ray_generator.get_events()
-
-start_utc = datetime.utcnow().replace(microsecond=0)
-
-fig = plt.figure(figsize=(12, 6), facecolor="black")
-gs = fig.add_gridspec(1, 2, width_ratios=[3, 1])
-ax_main = fig.add_subplot(gs[0])
-ax_side = fig.add_subplot(gs[1])
-
-ax_main.set_facecolor("black")
-ax_main.axis("off")
-clock_text = ax_main.text(
-    0.5,
-    0.5,
-    "",
-    color="cyan",
-    ha="center",
-    va="center",
-    fontsize=36,
-    fontfamily="monospace",
-)
-
-ax_side.set_facecolor("black")
-ax_side.axis("off")
-ax_side.set_title("Ray Detections", color="yellow", pad=20)
-detection_texts = []
-
-displayed_events = set()
-
-
-def update(frame):
-    global displayed_events
-
-    t = frame * TIME_STEP
-    if t > DURATION:
-        return [clock_text] + detection_texts
-
-    current_utc = start_utc + timedelta(seconds=t)
-    clock_text.set_text(current_utc.strftime("%Y-%m-%d\n%H:%M:%S UTC"))
-
-    new_detections = []
-    for event in events:
-        if abs(event["time"] - t) < TIME_STEP and event["time"] not in displayed_events:
-            displayed_events.add(event["time"])
-            event_utc = (start_utc + timedelta(seconds=event["time"])).strftime(
-                "%H:%M:%S"
-            )
-
-            # Include altitude information if available
-            altitude_info = (
-                f" | Alt: {event.get('altitude', 0):.0f}m"
-                if "altitude" in event
-                else ""
-            )
-
-            detection_text = ax_side.text(
-                0.1,
-                0.9 - len(detection_texts) * 0.15,
-                f"{event_utc} | {event['energy']:.1f} keV{altitude_info}",
-                color="yellow",
-                fontsize=14,
-                transform=ax_side.transAxes,
-            )
-            detection_texts.append(detection_text)
-
-    return [clock_text] + detection_texts
-
-
-ani = animation.FuncAnimation(
-    fig, update, frames=int(DURATION / TIME_STEP), interval=100, blit=True
-)
-
-plt.tight_layout()
-plt.show()
+FRAME_COUNT = int(DURATION / TIME_STEP)
+
+
+def main():
+    # matplotlib is only needed to actually show the display, so it is imported
+    # here rather than when the module is imported for its constants
+    import matplotlib
+
+    # Headless runs (e.g. rendering to a file) don't need a window, so use the
+    # faster non-interactive Agg backend. This has to happen before pyplot is
+    # imported.
+    if os.environ.get("PARAKEET_HEADLESS"):
+        matplotlib.use("Agg")
+
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
+    # Add the parent directory to the path so we can import cosmic_ray_utils. It
+    # pulls in numba and pandas, so it is imported here too.
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+    from cosmic_ray_utils import CosmicRayGenerator
+
+    # Create cosmic ray generator for visualization
+    ray_generator = CosmicRayGenerator(mode="predefined", duration=DURATION)
+    # Sort the events by time so update() can binary search for nearby ones
+    events = ray_generator.get_events().sorted_by_time()
+
+    start_utc = datetime.utcnow().replace(microsecond=0)
+
+    # Format every clock reading and detection line once, not on every frame
+    clock_strings = [
+        (start_utc + timedelta(seconds=frame * TIME_STEP)).strftime(
+            "%Y-%m-%d\n%H:%M:%S UTC"
+        )
+        for frame in range(FRAME_COUNT)
+    ]
+    detection_strings = [
+        f"{(start_utc + timedelta(seconds=time)).strftime('%H:%M:%S')} | {energy:.1f} keV"
+        # Include altitude information if available (not NaN)
+        + (f" | Alt: {altitude:.0f}m" if not np.isnan(altitude) else "")
+        for time, energy, altitude in zip(
+            events.time.tolist(), events.energy.tolist(), events.altitude.tolist()
+        )
+    ]
+
+    fig = plt.figure(figsize=(12, 6), facecolor="black")
+    gs = fig.add_gridspec(1, 2, width_ratios=[3, 1])
+    ax_main = fig.add_subplot(gs[0])
+    ax_side = fig.add_subplot(gs[1])
+
+    ax_main.set_facecolor("black")
+    ax_main.axis("off")
+    clock_text = ax_main.text(
+        0.5,
+        0.5,
+        "",
+        color="cyan",
+        ha="center",
+        va="center",
+        fontsize=36,
+        fontfamily="monospace",
+        animated=True,  # Redrawn every frame, so keep it out of the blit background
+    )
+
+    ax_side.set_facecolor("black")
+    ax_side.axis("off")
+    ax_side.set_title("Ray Detections", color="yellow", pad=20)
+
+    # Each event is shown at most once, so create one empty line of text per event
+    # up front and fill them in order as events are detected. The set of artists
+    # handed to FuncAnimation then never changes.
+    detection_texts = [
+        ax_side.text(
+            0.1,
+            0.9 - slot * 0.15,
+            "",
+            color="yellow",
+            fontsize=14,
+            transform=ax_side.transAxes,
+            animated=True,
+        )
+        for slot in range(len(events))
+    ]
+    animated_artists = [clock_text] + detection_texts
+
+    # Whether each event (by index into events) has been shown yet
+    displayed_events = np.zeros(len(events), dtype=bool)
+
+    def init():
+        # Draw nothing for the blit background, rather than letting FuncAnimation
+        # run update(0) for it, which would already mark events as displayed
+        return animated_artists
+
+    def update(frame):
+        t = frame * TIME_STEP
+        if t > DURATION:
+            return animated_artists
+
+        clock_text.set_text(clock_strings[frame])
+
+        # Binary search a window with a step of slack on each side, so float
+        # rounding at the edges can't drop an event, then apply the exact test
+        start = np.searchsorted(events.time, t - 2 * TIME_STEP)
+        end = np.searchsorted(events.time, t + 2 * TIME_STEP)
+
+        for i in range(start, end):
+            if abs(events.time[i] - t) < TIME_STEP and not displayed_events[i]:
+                # The next free slot is the one after every event shown so far
+                detection_text = detection_texts[np.count_nonzero(displayed_events)]
+                displayed_events[i] = True
+                detection_text.set_text(detection_strings[i])
+
+        return animated_artists
+
+    # Keep a reference to the animation, or it is garbage collected before it runs
+    ani = animation.FuncAnimation(
+        fig,
+        update,
+        frames=FRAME_COUNT,
+        init_func=init,
+        interval=100,
+        blit=True,
+    )
+
+    plt.tight_layout()
+    plt.show()
+    return ani
+
+
+if __name__ == "__main__":
+    main()